@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
+import hashlib
 import http.server
 import json
 import os
+import socket
 import sqlite3
 import sys
-import socketserver
-from urllib.parse import parse_qs, urlparse
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "data.db")
+MAX_BODY_BYTES = 1 << 20
 
 
 TABLE_CONFIG = {
@@ -75,221 +82,359 @@ TABLE_CONFIG = {
     },
 }
 
+for _table, _config in TABLE_CONFIG.items():
+    _config["columns"] = tuple(_config["columns"])
+    _config["write_columns"] = tuple(_config["write_columns"])
+    _col_sql = ", ".join(_config["columns"])
+    _write_sql = ", ".join(_config["write_columns"])
+    _placeholders = ", ".join(["?"] * len(_config["write_columns"]))
+    _config["select_sql"] = (
+        f"SELECT {_col_sql} FROM {_table} ORDER BY {_config['order_by']}"
+    )
+    _config["insert_sql"] = (
+        f"INSERT INTO {_table} ({_write_sql}) VALUES ({_placeholders})"
+    )
+    _config["delete_sql"] = f"DELETE FROM {_table}"
+    _config["snapshot_sql"] = f"SELECT {_write_sql} FROM {_table}"
+
+META_FREQUENCY_SQL = "SELECT value FROM frequency ORDER BY value"
+META_GENERATOR_SQL = (
+    "SELECT id, frequency, brand, model FROM generator ORDER BY id"
+)
+FREQUENCY_VALUES_SQL = "SELECT value FROM frequency"
+GENERATOR_IDS_SQL = "SELECT id FROM generator"
+
+
+def json_dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def query_name(query):
+    # Table names are plain identifiers, so a split beats a full parse_qs.
+    for part in query.split("&"):
+        key, _, value = part.partition("=")
+        if key == "name":
+            return value
+    return None
+
+
+_error_bodies = {}
+
+
+def error_body(name):
+    # Error payloads are tiny constant dicts; serialize each name once.
+    body = _error_bodies.get(name)
+    if body is None:
+        body = json_dumps({"error": name})
+        _error_bodies[name] = body
+    return body
+
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+# Tables whose rows change as a side effect of writing another table
+# (ON DELETE CASCADE foreign keys), so their cached responses go stale too.
+CASCADE_DEPENDENTS = {
+    "generator": ("generator_tank",),
+}
+
+_cache_lock = threading.Lock()
+_response_cache = {}
+_cache_epochs = {}
+
+
+def cache_get(key):
+    with _cache_lock:
+        return _response_cache.get(key)
+
+
+def cache_epoch(key):
+    with _cache_lock:
+        return _cache_epochs.get(key, 0)
+
+
+def cache_set(key, epoch, body):
+    # Only publish if no write invalidated the key while the body was being
+    # built; otherwise a slow reader could pin pre-write data in the cache.
+    with _cache_lock:
+        if _cache_epochs.get(key, 0) == epoch:
+            _response_cache[key] = body
+
+
+def cache_invalidate(table):
+    keys = ["table:" + table]
+    for dependent in CASCADE_DEPENDENTS.get(table, ()):
+        keys.append("table:" + dependent)
+    if table == "generator":
+        keys.append("meta")
+    with _cache_lock:
+        for key in keys:
+            _response_cache.pop(key, None)
+            _cache_epochs[key] = _cache_epochs.get(key, 0) + 1
+
+
+_conn_local = threading.local()
+
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys=ON")
+    conn = getattr(_conn_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            DB_PATH, check_same_thread=False, isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA busy_timeout=5000")
+        _conn_local.conn = conn
     return conn
 
 
 def init_db():
-    with get_conn() as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS frequency (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                value TEXT NOT NULL UNIQUE
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS phase (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                value TEXT NOT NULL UNIQUE
-            )
-            """
+    conn = get_conn()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS frequency (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            value TEXT NOT NULL UNIQUE
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS voltage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                frequency TEXT NOT NULL,
-                voltage TEXT NOT NULL,
-                FOREIGN KEY (frequency) REFERENCES frequency(value)
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS phase (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            value TEXT NOT NULL UNIQUE
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS engine (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                frequency TEXT NOT NULL,
-                brand TEXT NOT NULL,
-                model TEXT NOT NULL,
-                price REAL NOT NULL,
-                FOREIGN KEY (frequency) REFERENCES frequency(value)
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS voltage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            frequency TEXT NOT NULL,
+            voltage TEXT NOT NULL,
+            FOREIGN KEY (frequency) REFERENCES frequency(value)
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS generator (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                frequency TEXT NOT NULL,
-                brand TEXT NOT NULL,
-                model TEXT NOT NULL,
-                price REAL NOT NULL,
-                FOREIGN KEY (frequency) REFERENCES frequency(value)
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS engine (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            frequency TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            price REAL NOT NULL,
+            FOREIGN KEY (frequency) REFERENCES frequency(value)
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS generator_tank (
-                generator_id INTEGER NOT NULL,
-                tank_value TEXT NOT NULL,
-                price REAL NOT NULL DEFAULT 0,
-                PRIMARY KEY (generator_id, tank_value),
-                FOREIGN KEY (generator_id) REFERENCES generator(id) ON DELETE CASCADE
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS generator (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            frequency TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            price REAL NOT NULL,
+            FOREIGN KEY (frequency) REFERENCES frequency(value)
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS control_system (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS generator_tank (
+            generator_id INTEGER NOT NULL,
+            tank_value TEXT NOT NULL,
+            price REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (generator_id, tank_value),
+            FOREIGN KEY (generator_id) REFERENCES generator(id) ON DELETE CASCADE
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS switch (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS control_system (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS base (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS switch (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS battery (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS base (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS silencer (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS battery (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS elbow (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL
-            )
-            """
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS silencer (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL
         )
-        conn.executemany(
-            "INSERT OR IGNORE INTO frequency (value) VALUES (?)",
-            [("50hz",), ("60hz",)],
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS elbow (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            price REAL NOT NULL
         )
-        conn.commit()
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_voltage_order "
+        "ON voltage (frequency, voltage)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_engine_order "
+        "ON engine (frequency, brand, model)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_generator_order "
+        "ON generator (frequency, brand, model)"
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO frequency (value) VALUES (?), (?)",
+        ("50hz", "60hz"),
+    )
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
 
 
 def list_table_rows(table):
     config = TABLE_CONFIG.get(table)
     if not config:
         return None
-    columns = config["columns"]
-    order_by = config["order_by"]
-    col_sql = ", ".join(columns)
-    with get_conn() as conn:
-        cursor = conn.execute(
-            f"SELECT {col_sql} FROM {table} ORDER BY {order_by}"
-        )
-        rows = cursor.fetchall()
-    items = []
-    for row in rows:
-        item = {}
-        for col in columns:
-            item[col] = row[col]
-        items.append(item)
-    return items
+    conn = get_conn()
+    cursor = conn.execute(config["select_sql"])
+    return [dict(row) for row in cursor]
 
 
 def parse_price(value):
-    try:
+    if isinstance(value, (int, float)):
         price_value = float(value)
-    except (TypeError, ValueError):
-        return None
+    else:
+        try:
+            price_value = float(value)
+        except (TypeError, ValueError):
+            return None
     if price_value < 0:
         return None
     return price_value
 
 
-def validate_frequency(conn, value):
-    if not isinstance(value, str) or not value.strip():
-        return False
-    cursor = conn.execute(
-        "SELECT 1 FROM frequency WHERE value = ? LIMIT 1", (value.strip(),)
-    )
-    return cursor.fetchone() is not None
+def parse_price_field(ctx, value):
+    price_value = parse_price(value)
+    if price_value is None:
+        return None, "invalid_price"
+    return price_value, None
 
 
-def validate_generator_id(conn, value):
+def parse_frequency_field(ctx, value):
+    stripped = value.strip() if isinstance(value, str) else None
+    if not stripped or stripped not in ctx["frequencies"]:
+        return None, "invalid_frequency"
+    return stripped, None
+
+
+def parse_generator_id_field(ctx, value):
     try:
         generator_id = int(value)
     except (TypeError, ValueError):
-        return None
-    if generator_id <= 0:
-        return None
-    cursor = conn.execute(
-        "SELECT 1 FROM generator WHERE id = ? LIMIT 1", (generator_id,)
+        return None, "invalid_generator_id"
+    if generator_id not in ctx["generator_ids"]:
+        return None, "invalid_generator_id"
+    return generator_id, None
+
+
+def make_text_field_parser(column):
+    error = f"invalid_{column}"
+
+    def parse_text_field(ctx, value):
+        stripped = value.strip() if isinstance(value, str) else None
+        if not stripped:
+            return None, error
+        return stripped, None
+
+    return parse_text_field
+
+
+FIELD_PARSERS = {
+    "price": parse_price_field,
+    "frequency": parse_frequency_field,
+    "generator_id": parse_generator_id_field,
+}
+
+for _config in TABLE_CONFIG.values():
+    _config["parsers"] = tuple(
+        (column, FIELD_PARSERS.get(column) or make_text_field_parser(column))
+        for column in _config["write_columns"]
     )
-    if cursor.fetchone() is None:
-        return None
-    return generator_id
 
 
-def parse_row(conn, table, row):
+def build_parse_context(conn, config):
+    ctx = {}
+    if "frequency" in config["write_columns"]:
+        ctx["frequencies"] = {
+            row[0] for row in conn.execute(FREQUENCY_VALUES_SQL)
+        }
+    if "generator_id" in config["write_columns"]:
+        ctx["generator_ids"] = {
+            row[0] for row in conn.execute(GENERATOR_IDS_SQL)
+        }
+    return ctx
+
+
+def parse_row(ctx, table, row):
     if not isinstance(row, dict):
         return None, "invalid_row"
-    config = TABLE_CONFIG[table]
-    parsed = {}
-    for column in config["write_columns"]:
-        value = row.get(column)
-        if column == "price":
-            price_value = parse_price(value)
-            if price_value is None:
-                return None, "invalid_price"
-            parsed[column] = price_value
-            continue
-        if column == "frequency":
-            if not validate_frequency(conn, value):
-                return None, "invalid_frequency"
-            parsed[column] = value.strip()
-            continue
-        if column == "generator_id":
-            generator_id = validate_generator_id(conn, value)
-            if generator_id is None:
-                return None, "invalid_generator_id"
-            parsed[column] = generator_id
-            continue
-        if not isinstance(value, str) or not value.strip():
-            return None, f"invalid_{column}"
-        parsed[column] = value.strip()
-    return parsed, None
+    parsed = []
+    for column, parser in TABLE_CONFIG[table]["parsers"]:
+        value, err = parser(ctx, row.get(column))
+        if err:
+            return None, err
+        parsed.append(value)
+    return tuple(parsed), None
 
 
 def replace_table_rows(table, rows):
@@ -300,59 +445,91 @@ def replace_table_rows(table, rows):
         return None, "invalid_rows"
     if not isinstance(rows, list):
         return None, "invalid_rows"
-    with get_conn() as conn:
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ctx = build_parse_context(conn, config)
         parsed_rows = []
         for row in rows:
-            parsed, err = parse_row(conn, table, row)
+            parsed, err = parse_row(ctx, table, row)
             if err:
+                conn.execute("ROLLBACK")
                 return None, err
             parsed_rows.append(parsed)
 
-        try:
-            conn.execute(f"DELETE FROM {table}")
-            if parsed_rows:
-                columns = config["write_columns"]
-                col_sql = ", ".join(columns)
-                placeholders = ", ".join(["?"] * len(columns))
-                conn.executemany(
-                    f"INSERT INTO {table} ({col_sql}) VALUES ({placeholders})",
-                    [tuple(row[col] for col in columns) for row in parsed_rows],
-                )
-            conn.commit()
-        except sqlite3.IntegrityError:
-            return None, "integrity_error"
+        current_rows = sorted(
+            tuple(row) for row in conn.execute(config["snapshot_sql"])
+        )
+        if current_rows == sorted(parsed_rows):
+            conn.execute("COMMIT")
+            return len(parsed_rows), None
+
+        conn.execute(config["delete_sql"])
+        if parsed_rows:
+            conn.executemany(config["insert_sql"], parsed_rows)
+        conn.execute("COMMIT")
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK")
+        return None, "integrity_error"
     return len(parsed_rows), None
 
 
 class Handler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
     def _send_json(self, status, payload):
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_body(status, json_dumps(payload))
+
+    def _send_body(self, status, body, etag=None):
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
         self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
+        if hasattr(self, "_headers_buffer"):
+            # Flush status line, headers and body in one sendall instead of
+            # separate writes for the header block and the body.
+            self._headers_buffer.append(b"\r\n" + body)
+            self.flush_headers()
+        else:
+            self.end_headers()
+            self.wfile.write(body)
 
     def _read_json(self):
-        length = int(self.headers.get("Content-Length", "0"))
-        body = self.rfile.read(length) if length else b""
         try:
-            return json.loads(body.decode("utf-8")), None
-        except json.JSONDecodeError:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            return None, "invalid_json"
+        if length > MAX_BODY_BYTES:
+            # The oversized body is never read, so the connection cannot be
+            # reused for another request.
+            self.close_connection = True
+            return None, "body_too_large"
+        body = self.rfile.read(length) if length > 0 else b""
+        try:
+            return json_loads(body), None
+        except ValueError:
             return None, "invalid_json"
 
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        if parsed.path == "/api/meta":
-            with get_conn() as conn:
-                freq_rows = conn.execute(
-                    "SELECT value FROM frequency ORDER BY value"
-                ).fetchall()
-                generator_rows = conn.execute(
-                    "SELECT id, frequency, brand, model FROM generator ORDER BY id"
-                ).fetchall()
-            self._send_json(
-                200,
+    def _handle_meta(self, query):
+        cached = cache_get("meta")
+        if cached is None:
+            epoch = cache_epoch("meta")
+            conn = get_conn()
+            conn.execute("BEGIN DEFERRED")
+            try:
+                freq_rows = conn.execute(META_FREQUENCY_SQL).fetchall()
+                generator_rows = conn.execute(META_GENERATOR_SQL).fetchall()
+            finally:
+                conn.execute("COMMIT")
+            body = json_dumps(
                 {
                     "frequency": [row["value"] for row in freq_rows],
                     "generators": [
@@ -364,55 +541,92 @@ class Handler(http.server.SimpleHTTPRequestHandler):
                         }
                         for row in generator_rows
                     ],
-                },
+                }
             )
-            return
-
-        if parsed.path == "/api/table":
-            params = parse_qs(parsed.query)
-            table = params.get("name", [None])[0]
-            if table not in TABLE_CONFIG:
-                self._send_json(404, {"error": "table_not_found"})
-                return
-            rows = list_table_rows(table)
-            self._send_json(200, {"rows": rows})
-            return
-
-        if parsed.path == "/":
-            self.send_response(302)
-            self.send_header("Location", "/admin.html")
-            self.end_headers()
-            return
+            cached = (body, make_etag(body))
+            cache_set("meta", epoch, cached)
+        self._send_body(200, cached[0], etag=cached[1])
 
-        return super().do_GET()
-
-    def do_POST(self):
-        parsed = urlparse(self.path)
-        if parsed.path != "/api/table":
-            self.send_error(404, "Not Found")
+    def _handle_table_get(self, query):
+        table = query_name(query)
+        if table not in TABLE_CONFIG:
+            self._send_body(404, error_body("table_not_found"))
             return
+        cached = cache_get("table:" + table)
+        if cached is None:
+            epoch = cache_epoch("table:" + table)
+            body = json_dumps({"rows": list_table_rows(table)})
+            cached = (body, make_etag(body))
+            cache_set("table:" + table, epoch, cached)
+        self._send_body(200, cached[0], etag=cached[1])
+
+    def _handle_root(self, query):
+        self.send_response(302)
+        self.send_header("Location", "/admin.html")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
 
-        params = parse_qs(parsed.query)
-        table = params.get("name", [None])[0]
+    def _handle_table_post(self, query):
+        table = query_name(query)
         if table not in TABLE_CONFIG:
-            self._send_json(404, {"error": "table_not_found"})
+            self._send_body(404, error_body("table_not_found"))
             return
 
         payload, err = self._read_json()
         if err:
-            self._send_json(400, {"error": err})
+            status = 413 if err == "body_too_large" else 400
+            self._send_body(status, error_body(err))
             return
 
         rows = payload.get("rows")
         inserted, err = replace_table_rows(table, rows)
         if err:
-            self._send_json(400, {"error": err})
+            self._send_body(400, error_body(err))
             return
+        cache_invalidate(table)
         self._send_json(200, {"ok": True, "inserted": inserted})
 
+    GET_ROUTES = {
+        "/api/meta": _handle_meta,
+        "/api/table": _handle_table_get,
+        "/": _handle_root,
+    }
+    POST_ROUTES = {
+        "/api/table": _handle_table_post,
+    }
+
+    def copyfile(self, source, outputfile):
+        try:
+            source.fileno()
+        except (AttributeError, OSError):
+            # Not a real file (e.g. a generated directory listing).
+            return super().copyfile(source, outputfile)
+        # sendfile(2) path for static assets; socket.sendfile falls back to
+        # plain send() on platforms without os.sendfile.
+        self.connection.sendfile(source)
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        handler = self.GET_ROUTES.get(path)
+        if handler is not None:
+            return handler(self, query)
+        return super().do_GET()
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        handler = self.POST_ROUTES.get(path)
+        if handler is not None:
+            return handler(self, query)
+        self.send_error(404, "Not Found")
+
 # 定义一个支持多线程的类
-class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    pass
+class ThreadingTCPServer(http.server.ThreadingHTTPServer):
+    request_queue_size = 128
+
+    def server_bind(self):
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
 
 def main():
     port = 8000